@@ -1 +1,3 @@
-from .tables    import *
\ No newline at end of file
+from .writer     import *
+from .tables     import *
+from .migrations import *
\ No newline at end of file
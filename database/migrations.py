@@ -0,0 +1,149 @@
+import aiosqlite
+
+from .tables import BaseTable
+
+MIGRATIONS: list[tuple[int, list[str]]] = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            "group" TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS points (
+            id INTEGER,
+            count INTEGER,
+            course TEXT,
+            timestamp UNSIGNED BIG INT,
+            description TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS groups (
+            id INTEGER PRIMARY KEY,
+            captain_id INTEGER NOT NULL default NULL,
+            deputies TEXT default "",
+            members TEXT default ""
+        )
+        """,
+    ]),
+    (2, [
+        """
+        CREATE TABLE points_new (
+            point_id INTEGER PRIMARY KEY,
+            id INTEGER,
+            count INTEGER,
+            course TEXT,
+            timestamp UNSIGNED BIG INT,
+            description TEXT
+        )
+        """,
+        """
+        INSERT INTO points_new (point_id, id, count, course, timestamp, description)
+        SELECT rowid, id, count, course, timestamp, description FROM points
+        """,
+        "DROP TABLE points",
+        "ALTER TABLE points_new RENAME TO points",
+    ]),
+    (3, [
+        """
+        CREATE INDEX IF NOT EXISTS points_user_course
+        ON points (id, course, timestamp)
+        """,
+    ]),
+    (4, [
+        """
+        CREATE TABLE IF NOT EXISTS courses (
+            course_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            UNIQUE (user_id, name)
+        )
+        """,
+        """
+        INSERT OR IGNORE INTO courses (user_id, name)
+        SELECT DISTINCT id, course FROM points
+        """,
+        "ALTER TABLE points ADD COLUMN course_id INTEGER",
+        """
+        UPDATE points
+        SET course_id = (SELECT course_id FROM courses WHERE user_id = points.id AND name = points.course)
+        """,
+        "DROP INDEX IF EXISTS points_user_course",
+        """
+        CREATE INDEX IF NOT EXISTS points_user_course_id
+        ON points (id, course_id, timestamp)
+        """,
+    ]),
+    (5, [
+        """
+        CREATE TABLE IF NOT EXISTS navigation (
+            chat_id INTEGER,
+            message_id INTEGER,
+            stack TEXT NOT NULL,
+            expires_at INTEGER NOT NULL,
+            PRIMARY KEY (chat_id, message_id)
+        )
+        """,
+    ]),
+    (6, [
+        """
+        CREATE TABLE IF NOT EXISTS states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS states_updated_at
+        ON states (updated_at)
+        """,
+    ]),
+    (7, [
+        "ALTER TABLE users ADD COLUMN subscribed INTEGER NOT NULL DEFAULT 0",
+        """
+        CREATE INDEX IF NOT EXISTS users_subscribed_group
+        ON users ("group", id) WHERE subscribed = 1
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS push_runs (
+            day TEXT PRIMARY KEY,
+            last_group TEXT,
+            last_user_id INTEGER,
+            sent INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            finished_at INTEGER
+        )
+        """,
+    ]),
+    (8, [
+        "ALTER TABLE groups ADD COLUMN faculty TEXT",
+        'ALTER TABLE groups ADD COLUMN "group" TEXT',
+    ]),
+]
+
+async def get_schema_version(db: aiosqlite.Connection) -> int:
+    await db.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    async with db.execute("SELECT MAX(version) FROM schema_version") as cursor:
+        row = await cursor.fetchone()
+    return row[0] or 0
+
+async def migrate(db_path="database.db") -> int:
+    db = await BaseTable.connect(db_path)
+    version = await get_schema_version(db)
+    for step_version, statements in MIGRATIONS:
+        if step_version <= version:
+            continue
+        await db.execute("BEGIN")
+        try:
+            for statement in statements:
+                await db.execute(statement)
+            await db.execute("INSERT INTO schema_version (version) VALUES (?)", (step_version,))
+        except:
+            await db.rollback()
+            raise
+        await db.commit()
+        version = step_version
+    return version
@@ -1,72 +1,123 @@
 import aiosqlite
-import asyncio
 
-from .types import User, Points, Group
+from contextlib import asynccontextmanager
+
+from .types  import User, Points, Group, UserRow, PointsRow, GroupRow
+from .writer import WriteQueue
 
 class BaseTable:
+    connection: aiosqlite.Connection | None = None
+    connection_path: str | None = None
+    writer: WriteQueue | None = None
+
     def __init__(self, db_path="database.db"):
         self.db_path = db_path
 
-    async def execute(self, query: str, *args):
+    @classmethod
+    async def connect(cls, db_path="database.db", cached_statements=256, busy_timeout=30):
+        if BaseTable.connection is None:
+            BaseTable.connection = await aiosqlite.connect(db_path, cached_statements=cached_statements, timeout=busy_timeout)
+            BaseTable.connection.row_factory = aiosqlite.Row
+            await BaseTable.connection.execute("PRAGMA journal_mode=WAL")
+            BaseTable.connection_path = db_path
+        return BaseTable.connection
+
+    @classmethod
+    async def start_writer(cls, db_path="database.db", window: float = 0.005, max_batch: int = 64, busy_timeout=30):
+        if BaseTable.writer is None:
+            connection = await aiosqlite.connect(db_path, timeout=busy_timeout)
+            connection.row_factory = aiosqlite.Row
+            BaseTable.writer = WriteQueue(connection, window, max_batch)
+            BaseTable.writer.start()
+        return BaseTable.writer
+
+    @classmethod
+    async def close(cls):
+        if BaseTable.writer is not None:
+            await BaseTable.writer.stop()
+            await BaseTable.writer.connection.close()
+            BaseTable.writer = None
+        if BaseTable.connection is not None:
+            await BaseTable.connection.close()
+            BaseTable.connection = None
+
+    @asynccontextmanager
+    async def connect_db(self):
+        if BaseTable.connection is not None:
+            yield BaseTable.connection
+            return
         async with aiosqlite.connect(self.db_path) as db:
             db.row_factory = aiosqlite.Row
+            yield db
+
+    async def execute(self, query: str, *args):
+        async with self.connect_db() as db:
             async with db.execute(query, args) as cursor:
                 return await cursor.fetchall()
 
     async def execute_commit(self, query: str, *args):
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        if BaseTable.writer is not None:
+            return await BaseTable.writer.execute(query, *args)
+        async with self.connect_db() as db:
             async with db.execute(query, args) as cursor:
+                rows = await cursor.fetchall()
                 await db.commit()
-                return await cursor.fetchall()
+                return rows
 
     async def fetchone(self, query: str, *args):
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connect_db() as db:
             async with db.execute(query, args) as cursor:
                 row = await cursor.fetchone()
                 return row
 
     async def fetchall(self, query: str, *args):
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connect_db() as db:
             async with db.execute(query, args) as cursor:
                 return await cursor.fetchall()
 
     async def fetchval(self, query: str, *args):
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self.connect_db() as db:
             async with db.execute(query, args) as cursor:
                 row = await cursor.fetchone()
                 return row
 
+    async def stream(self, table: str, key: str, after=None, batch_size: int = 500, keyset: bool = False):
+        where = f"WHERE {key} > ?" if after is not None else ""
+        if not keyset:
+            async with aiosqlite.connect(BaseTable.connection_path or self.db_path) as db:
+                db.row_factory = aiosqlite.Row
+                async with db.execute(f"SELECT * FROM {table} {where} ORDER BY {key}", () if after is None else (after,)) as cursor:
+                    while rows := await cursor.fetchmany(batch_size):
+                        for row in rows:
+                            yield row
+            return
+        while True:
+            rows = await self.fetchall(
+                f"SELECT * FROM {table} {where} ORDER BY {key} LIMIT ?",
+                *(() if after is None else (after,)),
+                batch_size
+            )
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                return
+            after, where = rows[-1][key], f"WHERE {key} > ?"
+
     async def add_column(self, table: str, column: str, col_type: str):
         await self.execute_commit(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
 
 class UsersTable(BaseTable):
-    def __init__(self, db_path="database.db"):
-        super().__init__(db_path)
-        asyncio.run(self.create_table())
-
-    async def create_table(self):
-        await self.execute_commit(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                "group" TEXT
-            )
-            """
-        )
-
     async def add_user(self, user: User):
-        await self.execute_commit(
+        rows = await self.execute_commit(
             """
             INSERT INTO users (id, "group")
             VALUES (?, ?)
+            RETURNING *
             """,
             user.id,
             user.group
         )
+        return UserRow.from_row(rows[0])
 
     async def get_user(self, user_id: int):
         row = await self.fetchone(
@@ -76,7 +127,7 @@ class UsersTable(BaseTable):
             """,
             user_id
         )
-        return User(**dict(row)) if row else None
+        return UserRow.from_row(row) if row else None
 
     async def get_users(self):
         rows = await self.fetchall(
@@ -84,7 +135,11 @@ class UsersTable(BaseTable):
             SELECT * FROM users
             """
         )
-        return [User(**dict(row)) for row in rows] if rows else None
+        return [UserRow.from_row(row) for row in rows] if rows else None
+
+    async def iter_users(self, batch_size: int = 500, after_id: int | None = None, keyset: bool = False):
+        async for row in self.stream("users", "id", after_id, batch_size, keyset):
+            yield UserRow.from_row(row)
 
     async def update_group(self, user_id: int, group: str):
         await self.execute_commit(
@@ -97,34 +152,47 @@ class UsersTable(BaseTable):
             user_id
         )
 
-class PointsTable(BaseTable):
-    def __init__(self, db_path="database.db"):
-        super().__init__(db_path)
-        asyncio.run(self.create_table())
-
-    async def create_table(self):
+    async def set_subscribed(self, user_id: int, subscribed: bool):
         await self.execute_commit(
             """
-            CREATE TABLE IF NOT EXISTS points (
-                id INTEGER,
-                count INTEGER,
-                course TEXT,
-                timestamp UNSIGNED BIG INT,
-                description TEXT
-            )
-            """
+            UPDATE users
+            SET subscribed = ?
+            WHERE id = ?
+            """,
+            int(subscribed),
+            user_id
         )
 
-    async def get_points(self, user_id: int, course: str):
+    async def iter_subscribers(self, after: tuple[str, int] | None = None, batch_size: int = 500):
+        while True:
+            rows = await self.fetchall(
+                f"""
+                SELECT * FROM users
+                WHERE subscribed = 1 AND "group" != 'не указана'
+                {'AND ("group", id) > (?, ?)' if after else ''}
+                ORDER BY "group", id
+                LIMIT ?
+                """,
+                *(after or ()),
+                batch_size
+            )
+            for row in rows:
+                yield UserRow.from_row(row)
+            if len(rows) < batch_size:
+                return
+            after = (rows[-1]["group"], rows[-1]["id"])
+
+class PointsTable(BaseTable):
+    async def get_points(self, user_id: int, course_id: int):
         row = await self.fetchone(
             """
             SELECT * FROM points
-            WHERE id = ? AND course = ?
+            WHERE id = ? AND course_id = ?
             """,
             user_id,
-            course
+            course_id
         )
-        return Points(**dict(row)) if row else None
+        return PointsRow.from_row(row) if row else None
 
     async def get_all_points(self):
         rows = await self.fetchall(
@@ -132,27 +200,30 @@ class PointsTable(BaseTable):
             SELECT * FROM points
             """
         )
-        return [Points(**dict(row)) for row in rows] if rows else None
+        return [PointsRow.from_row(row) for row in rows] if rows else None
+
+    async def iter_all_points(self, batch_size: int = 500, after_id: int | None = None, keyset: bool = False):
+        async for row in self.stream("points", "point_id", after_id, batch_size, keyset):
+            yield PointsRow.from_row(row)
 
-    async def delete_points(self, user_id: int, course: str, timestamp: int):
+    async def delete_points(self, user_id: int, point_id: int):
         await self.execute_commit(
             """
             DELETE FROM points
-            WHERE id = ? AND course = ? AND timestamp = ?
+            WHERE point_id = ? AND id = ?
             """,
-            user_id,
-            course,
-            timestamp
+            point_id,
+            user_id
         )
 
-    async def delete_all_points_by_course(self, user_id: int, course: str):
+    async def delete_all_points_by_course(self, user_id: int, course_id: int):
         await self.execute_commit(
             """
             DELETE FROM points
-            WHERE id = ? AND course = ?
+            WHERE id = ? AND course_id = ?
             """,
             user_id,
-            course
+            course_id
         )
 
     async def get_all_by_user(self, user_id: int):
@@ -163,103 +234,208 @@ class PointsTable(BaseTable):
             """,
             user_id
         )
-        return [Points(**dict(row)) for row in rows] if rows else None
+        return [PointsRow.from_row(row) for row in rows] if rows else None
     
-    async def get_all_by_course(self, user_id: int, course: str):
+    async def get_all_by_course(self, user_id: int, course_id: int):
         rows = await self.fetchall(
             """
             SELECT * FROM points
-            WHERE id = ? AND course = ?
+            WHERE id = ? AND course_id = ?
+            ORDER BY timestamp
             """,
             user_id,
-            course
+            course_id
         )
-        return [Points(**dict(row)) for row in rows] if rows else None
+        return [PointsRow.from_row(row) for row in rows] if rows else None
     
     async def add_points(self, points: Points):
-        await self.execute_commit(
+        rows = await self.execute_commit(
             """
-            INSERT INTO points (id, count, course, description, timestamp)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO points (id, count, course, course_id, description, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+            RETURNING *
             """,
             points.id,
             points.count,
             points.course,
+            points.course_id,
             points.description,
             points.timestamp
         )
-
-        row = await self.fetchone(
-            """
-            SELECT * FROM points
-            WHERE id = ? AND course = ?
-            ORDER BY timestamp DESC
-            LIMIT 1
-            """,
-            points.id,
-            points.course
-        )
-        
-        return Points(**dict(row))
+        return PointsRow.from_row(rows[0])
     
-    async def edit_description(self, user_id: int, course: str, timestamp: int, description: str):
+    async def edit_description(self, user_id: int, point_id: int, description: str):
         await self.execute_commit(
             """
             UPDATE points
             SET description = ?
-            WHERE id = ? AND course = ? AND timestamp = ?
+            WHERE point_id = ? AND id = ?
             """,
             description,
-            user_id,
-            course,
-            timestamp
+            point_id,
+            user_id
         )
 
     async def get_sorted_points(self, user_id: int) -> dict[str, list[int]]:
+        totals = await self.get_course_totals(user_id)
+        return {course: counts for course, counts, _ in totals} if totals else None
+
+    async def get_course_totals(self, user_id: int) -> list[tuple[str, list[int], int]]:
         rows = await self.fetchall(
             """
-            SELECT * FROM points
+            SELECT course, GROUP_CONCAT(count, ' ') AS counts, SUM(count) AS total
+            FROM (
+                SELECT course_id, course, count, timestamp FROM points
+                WHERE id = ?
+                ORDER BY course_id, timestamp
+            )
+            GROUP BY course_id
+            ORDER BY MIN(timestamp)
+            """,
+            user_id
+        )
+        return [(row["course"], [int(count) for count in row["counts"].split()], row["total"]) for row in rows]
+
+    async def get_courses(self, user_id: int) -> list[tuple[int, str]]:
+        rows = await self.fetchall(
+            """
+            SELECT course_id, course FROM points
             WHERE id = ?
+            GROUP BY course_id
+            ORDER BY MIN(timestamp)
             """,
             user_id
         )
-        if not rows:
-            return None
-        points = [Points(**dict(row)) for row in rows]
-        sorted_by_course = {}
-        for point in points:
-            sorted_by_course.setdefault(point.course, []).append(point.count)
-        return sorted_by_course
+        return [(row["course_id"], row["course"]) for row in rows]
     
-    async def get_point(self, user_id: int, course: str, timestamp: int):
+    async def get_point(self, user_id: int, point_id: int):
         row = await self.fetchone(
             """
             SELECT * FROM points
-            WHERE id = ? AND course = ? AND timestamp = ?
+            WHERE point_id = ? AND id = ?
             """,
-            user_id,
-            course,
-            timestamp
+            point_id,
+            user_id
         )
-        return Points(**dict(row)) if row else None
+        return PointsRow.from_row(row) if row else None
     
-class GroupTable(BaseTable):
-    def __init__(self, db_path="database.db"):
-        super().__init__(db_path)
-        asyncio.run(self.create_table())
+class CoursesTable(BaseTable):
+    ids: dict[tuple[int, str], int] = {}
+    names: dict[int, tuple[int, str]] = {}
+
+    def remember(self, course_id: int, user_id: int, name: str):
+        CoursesTable.ids[user_id, name] = course_id
+        CoursesTable.names[course_id] = (user_id, name)
+
+    async def get_course_id(self, user_id: int, name: str) -> int:
+        course_id = CoursesTable.ids.get((user_id, name))
+        if course_id is None:
+            rows = await self.execute_commit(
+                """
+                INSERT INTO courses (user_id, name)
+                VALUES (?, ?)
+                ON CONFLICT (user_id, name) DO UPDATE SET name = excluded.name
+                RETURNING course_id
+                """,
+                user_id,
+                name
+            )
+            course_id = rows[0]["course_id"]
+            self.remember(course_id, user_id, name)
+        return course_id
 
-    async def create_table(self):
+    async def get_course_name(self, user_id: int, course_id: int) -> str | None:
+        if course_id not in CoursesTable.names:
+            row = await self.fetchone(
+                """
+                SELECT * FROM courses
+                WHERE course_id = ?
+                """,
+                course_id
+            )
+            if not row:
+                return None
+            self.remember(row["course_id"], row["user_id"], row["name"])
+        owner, name = CoursesTable.names[course_id]
+        return name if owner == user_id else None
+
+class NavigationTable(BaseTable):
+    async def save_stack(self, chat_id: int, message_id: int, stack: list[str], expires_at: int):
         await self.execute_commit(
             """
-            CREATE TABLE IF NOT EXISTS groups (
-                id INTEGER PRIMARY KEY,
-                captain_id INTEGER NOT NULL default NULL,
-                deputies TEXT default "",
-                members TEXT default ""
-            )
+            INSERT OR REPLACE INTO navigation (chat_id, message_id, stack, expires_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            chat_id,
+            message_id,
+            "\n".join(stack),
+            expires_at
+        )
+
+    async def pop_stack(self, chat_id: int, message_id: int, now: int) -> list[str] | None:
+        rows = await self.execute_commit(
+            """
+            DELETE FROM navigation
+            WHERE chat_id = ? AND message_id = ?
+            RETURNING stack, expires_at
+            """,
+            chat_id,
+            message_id
+        )
+        if not rows or rows[0]["expires_at"] < now:
+            return None
+        return rows[0]["stack"].split("\n")
+
+    async def delete_expired(self, now: int):
+        await self.execute_commit(
+            """
+            DELETE FROM navigation
+            WHERE expires_at < ?
+            """,
+            now
+        )
+
+class StatesTable(BaseTable):
+    async def get_state(self, key: str):
+        return await self.fetchone(
+            """
+            SELECT * FROM states
+            WHERE key = ?
+            """,
+            key
+        )
+
+    async def set_state(self, key: str, state: str | None, data: str, updated_at: int):
+        await self.execute_commit(
+            """
+            INSERT OR REPLACE INTO states (key, state, data, updated_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            key,
+            state,
+            data,
+            updated_at
+        )
+
+    async def delete_state(self, key: str):
+        await self.execute_commit(
+            """
+            DELETE FROM states
+            WHERE key = ?
+            """,
+            key
+        )
+
+    async def delete_expired(self, updated_before: int):
+        await self.execute_commit(
             """
+            DELETE FROM states
+            WHERE updated_at < ?
+            """,
+            updated_before
         )
 
+class GroupTable(BaseTable):
     async def add_group(self, group_id: int):
         await self.execute_commit(
             """
@@ -277,7 +453,7 @@ class GroupTable(BaseTable):
             """,
             group_id
         )
-        return Group(**dict(row)) if row else None
+        return GroupRow.from_row(row) if row else None
     
     async def get_groups(self):
         rows = await self.fetchall(
@@ -285,7 +461,11 @@ class GroupTable(BaseTable):
             SELECT * FROM groups
             """
         )
-        return [Group(**dict(row)) for row in rows] if rows else None
+        return [GroupRow.from_row(row) for row in rows] if rows else None
+
+    async def iter_groups(self, batch_size: int = 500, after_id: int | None = None, keyset: bool = False):
+        async for row in self.stream("groups", "id", after_id, batch_size, keyset):
+            yield GroupRow.from_row(row)
     
     async def edit_group(self, group: Group):
         await self.execute_commit(
@@ -298,4 +478,56 @@ class GroupTable(BaseTable):
             "\n".join(group.deputies),
             "\n".join(group.members),
             group.id
-        )
\ No newline at end of file
+        )
+
+    async def update_group(self, group_id: int, captain_id: int, faculty: str, group: str):
+        await self.execute_commit(
+            """
+            INSERT INTO groups (id, captain_id, faculty, "group")
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE
+            SET faculty = excluded.faculty, "group" = excluded."group"
+            """,
+            group_id,
+            captain_id,
+            faculty,
+            group
+        )
+
+class PushRunsTable(BaseTable):
+    async def get_run(self, day: str):
+        return await self.fetchone(
+            """
+            SELECT * FROM push_runs
+            WHERE day = ?
+            """,
+            day
+        )
+
+    async def save_progress(self, day: str, last_group: str, last_user_id: int, sent: int, failed: int):
+        await self.execute_commit(
+            """
+            INSERT INTO push_runs (day, last_group, last_user_id, sent, failed)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (day) DO UPDATE
+            SET last_group = excluded.last_group, last_user_id = excluded.last_user_id,
+                sent = excluded.sent, failed = excluded.failed
+            """,
+            day,
+            last_group,
+            last_user_id,
+            sent,
+            failed
+        )
+
+    async def finish(self, day: str, finished_at: int):
+        await self.execute_commit(
+            """
+            INSERT INTO push_runs (day, finished_at)
+            VALUES (?, ?)
+            ON CONFLICT (day) DO UPDATE
+            SET finished_at = excluded.finished_at
+            """,
+            day,
+            finished_at
+        )
@@ -1,3 +1,6 @@
+from dataclasses import dataclass
+from sqlite3 import Row
+
 from pydantic import BaseModel
 
 class User(BaseModel):
@@ -5,9 +8,11 @@ class User(BaseModel):
     group   : str
 
 class Points(BaseModel):
+    point_id    : int | None = None
     id          : int
     count       : int
     course      : str
+    course_id   : int | None = None
     description : str | None = None
     timestamp   : int | None = None
 
@@ -24,4 +29,63 @@ class Group(BaseModel):
             data["members"] = sorted([member for member in members.split("\n") if member])
         if isinstance(deputies, str):
             data["deputies"] = sorted([int(depaty) for depaty in deputies.split("\n") if depaty])
-        super().__init__(**data)
\ No newline at end of file
+        super().__init__(**data)
+
+@dataclass(slots=True)
+class UserRow:
+    id          : int
+    group       : str
+    subscribed  : bool = False
+
+    @classmethod
+    def from_row(cls, row: Row) -> "UserRow":
+        return cls(row["id"], row["group"], bool(row["subscribed"]))
+
+@dataclass(slots=True)
+class PointsRow:
+    point_id    : int
+    id          : int
+    count       : int
+    course      : str
+    course_id   : int
+    description : str | None
+    timestamp   : int | None
+
+    @classmethod
+    def from_row(cls, row: Row) -> "PointsRow":
+        return cls(row["point_id"], row["id"], row["count"], row["course"], row["course_id"], row["description"], row["timestamp"])
+
+class GroupRow:
+    __slots__ = ("id", "captain_id", "faculty", "group", "_members", "_deputies")
+
+    def __init__(
+        self,
+        id: int,
+        captain_id: int | None,
+        members: str | None,
+        deputies: str | None,
+        faculty: str | None = None,
+        group: str | None = None
+    ):
+        self.id = id
+        self.captain_id = captain_id
+        self.faculty = faculty
+        self.group = group
+        self._members = members or ""
+        self._deputies = deputies or ""
+
+    @classmethod
+    def from_row(cls, row: Row) -> "GroupRow":
+        return cls(row["id"], row["captain_id"], row["members"], row["deputies"], row["faculty"], row["group"])
+
+    @property
+    def members(self) -> list[str]:
+        if isinstance(self._members, str):
+            self._members = sorted(member for member in self._members.split("\n") if member)
+        return self._members
+
+    @property
+    def deputies(self) -> list[int]:
+        if isinstance(self._deputies, str):
+            self._deputies = sorted(int(deputy) for deputy in self._deputies.split("\n") if deputy)
+        return self._deputies
@@ -0,0 +1,86 @@
+import asyncio
+
+import aiosqlite
+
+class WriteQueue:
+    def __init__(self, connection: aiosqlite.Connection, window: float = 0.005, max_batch: int = 64):
+        self.connection = connection
+        self.window = window
+        self.max_batch = max_batch
+        self.queue: asyncio.Queue[tuple[str, tuple, asyncio.Future] | None] = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self.queue.put_nowait(None)
+        await self._task
+        self._task = None
+        while not self.queue.empty():
+            await self._commit(self._drain(self.max_batch))
+
+    async def execute(self, query: str, *args) -> list[aiosqlite.Row]:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((query, args, future))
+        return await future
+
+    def _drain(self, limit: int) -> list[tuple[str, tuple, asyncio.Future]]:
+        batch = []
+        while not self.queue.empty() and len(batch) < limit:
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while (item := await self.queue.get()) is not None:
+            batch = [item]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    item = self.queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    await self._commit(batch)
+                    return
+                batch.append(item)
+            await self._commit(batch)
+
+    async def _commit(self, batch: list[tuple[str, tuple, asyncio.Future]]):
+        db = self.connection
+        results = []
+        try:
+            if not db.in_transaction:
+                await db.execute("BEGIN IMMEDIATE")
+            for query, args, future in batch:
+                try:
+                    results.append((future, await db.execute_fetchall(query, args), None))
+                except aiosqlite.DatabaseError as error:
+                    results.append((future, None, error))
+            await db.commit()
+        except (Exception, asyncio.CancelledError) as error:
+            if db.in_transaction:
+                await asyncio.shield(db.rollback())
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error if isinstance(error, Exception) else RuntimeError("Write was cancelled"))
+            if isinstance(error, asyncio.CancelledError):
+                raise
+            return
+        for future, rows, error in results:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(rows)
+            else:
+                future.set_exception(error)
@@ -1,14 +1,32 @@
-from aiogram.filters.callback_data  import CallbackData
+from aiogram.filters.callback_data  import CallbackData, CallbackQueryFilter
+from aiogram.types                  import CallbackQuery
+from magic_filter                   import MagicFilter
 from enum                           import Enum
 
+class ParsedCallbackFilter(CallbackQueryFilter):
+    async def __call__(self, query: CallbackQuery, callback_data: CallbackData | None = None):
+        if callback_data is None:
+            return await super().__call__(query)
+        if not isinstance(callback_data, self.callback_data):
+            return False
+        if self.rule is None or self.rule.resolve(callback_data):
+            return {"callback_data": callback_data}
+        return False
+
+class ParsedCallback:
+    @classmethod
+    def filter(cls, rule: MagicFilter | None = None) -> ParsedCallbackFilter:
+        return ParsedCallbackFilter(callback_data=cls, rule=rule)
+
 class MenuAction(Enum):
     PROFILE = "p"
     POINTS  = "pts"
     MORE_DETAILS = "m"
     CHANGE_GROUP = "cg"
     GROUP_MENU = "gm"
+    SUBSCRIBE = "s"
 
-class MenuCallback(CallbackData, prefix="m"):
+class MenuCallback(ParsedCallback, CallbackData, prefix="m"):
     action: MenuAction
     user_id: int
 
@@ -16,7 +34,7 @@ class PointsAction(Enum):
     ADD = "a"
     DELETE = "d"
 
-class PointsCallback(CallbackData, prefix="p"):
+class PointsCallback(ParsedCallback, CallbackData, prefix="p"):
     action: PointsAction
     user_id: int | None = None
 
@@ -30,25 +48,40 @@ class CourseAction(Enum):
     MORE_DETAILS = "m"
     MORE_DETAILS_CONFIRM = "mc"
     
-class CourseCallback(CallbackData, prefix="c", sep="|"):
+class CourseCallback(ParsedCallback, CallbackData, prefix="c", sep="|"):
     user_id: int
     action: CourseAction
-    course: str | None = None
-    timestamp: int | None = None
+    course_id: int | None = None
+    point_id: int | None = None
     count: int | None = None
     description: str | None = None
-    back_to: str | None = None
+    back: int | None = None
 
-class GroupSelectCallback(CallbackData, prefix="g"):
+class GroupSelectCallback(ParsedCallback, CallbackData, prefix="g"):
     user_id: int
     faculty: int | None = None
     group: str | None = None
+    version: int | None = None
 
 class GroupMenuAction(Enum):
     CHANGE_GROUP = "cg"
+    SELECT_FACULTY = "sf"
+    SET_GROUP = "sg"
 
-class GroupMenuCallback(CallbackData, prefix="gm"):
+class GroupMenuCallback(ParsedCallback, CallbackData, prefix="gm"):
     user_id: int
     faculty: int | None = None
     group: str | None = None
-    action: GroupMenuAction
\ No newline at end of file
+    action: GroupMenuAction
+    version: int | None = None
+
+CALLBACKS: list[type[CallbackData]] = [MenuCallback, PointsCallback, CourseCallback, GroupSelectCallback, GroupMenuCallback]
+
+def parse_callback(data: str) -> CallbackData | None:
+    for callback in CALLBACKS:
+        if data.startswith(callback.__prefix__ + callback.__separator__):
+            try:
+                return callback.unpack(data)
+            except (TypeError, ValueError):
+                return None
+    return None
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.utils import keyboard
+
+from utils import back_button
+from timetable import Selectors
+from .callbacks import (
+    MenuCallback, MenuAction,
+    PointsCallback, PointsAction,
+    CourseCallback, CourseAction,
+    GroupSelectCallback, GroupMenuCallback, GroupMenuAction,
+    CALLBACKS
+)
+
+USER_ID_INDEX = {callback: list(callback.model_fields).index("user_id") + 1 for callback in CALLBACKS}
+
+class MarkupCache:
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.markups: OrderedDict[Hashable, InlineKeyboardMarkup] = OrderedDict()
+
+    def get(self, key: Hashable, build: Callable[[], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+        markup = self.markups.get(key)
+        if markup is None:
+            markup = self.markups[key] = build()
+            while len(self.markups) > self.max_size:
+                self.markups.popitem(last=False)
+        else:
+            self.markups.move_to_end(key)
+        return markup
+
+markups = MarkupCache()
+
+def stamp_callback_data(callback_data: str, user_id: int) -> str:
+    for callback in CALLBACKS:
+        if callback_data.startswith(callback.__prefix__ + callback.__separator__):
+            parts = callback_data.split(callback.__separator__)
+            parts[USER_ID_INDEX[callback]] = str(user_id)
+            return callback.__separator__.join(parts)
+    return callback_data
+
+def stamp(markup: InlineKeyboardMarkup, user_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup.model_construct(inline_keyboard=[
+        [
+            InlineKeyboardButton.model_construct(text=button.text, callback_data=stamp_callback_data(button.callback_data, user_id))
+            for button in row
+        ]
+        for row in markup.inline_keyboard
+    ])
+
+def user_markup(kind: Hashable, user_id: int, version: Hashable, build: Callable[[int], InlineKeyboardMarkup]) -> InlineKeyboardMarkup:
+    template = markups.get((kind, None, version), lambda: build(0))
+    return markups.get((kind, user_id, version), lambda: stamp(template, user_id))
+
+def profile_markup(user_id: int, is_owner: bool, subscribed: bool = False) -> InlineKeyboardMarkup:
+    def build(user_id: int) -> InlineKeyboardMarkup:
+        buttons = keyboard.InlineKeyboardBuilder()
+        buttons.button(text="📊 Мои баллы", callback_data=MenuCallback(action=MenuAction.POINTS, user_id=user_id))
+        buttons.button(text="👥 Сменить группу", callback_data=MenuCallback(action=MenuAction.CHANGE_GROUP, user_id=user_id))
+        buttons.button(
+            text="🔕 Отписаться от утренней рассылки" if subscribed else "🔔 Утренняя рассылка расписания",
+            callback_data=MenuCallback(action=MenuAction.SUBSCRIBE, user_id=user_id)
+        )
+        if is_owner:
+            buttons.button(text="🔧 Настройки группы", callback_data=MenuCallback(action=MenuAction.GROUP_MENU, user_id=user_id))
+        buttons.adjust(1)
+        return buttons.as_markup()
+    return user_markup(("profile", is_owner, subscribed), user_id, None, build)
+
+def points_markup(user_id: int) -> InlineKeyboardMarkup:
+    def build(user_id: int) -> InlineKeyboardMarkup:
+        buttons = keyboard.InlineKeyboardBuilder()
+        buttons.button(text="➕ Добавить баллы", callback_data=PointsCallback(action=PointsAction.ADD, user_id=user_id))
+        buttons.button(text="➖ Удалить баллы", callback_data=PointsCallback(action=PointsAction.DELETE, user_id=user_id))
+        buttons.button(text="🔍 Подробнее", callback_data=MenuCallback(action=MenuAction.MORE_DETAILS, user_id=user_id))
+        buttons.add(back_button(MenuCallback(action=MenuAction.PROFILE, user_id=user_id).pack()))
+        buttons.adjust(1)
+        return buttons.as_markup()
+    return user_markup("points", user_id, None, build)
+
+def scores_markup(user_id: int, course_id: int) -> InlineKeyboardMarkup:
+    def build(user_id: int) -> InlineKeyboardMarkup:
+        buttons = keyboard.InlineKeyboardBuilder()
+        for i in range(1, 11):
+            buttons.button(text=str(i), callback_data=CourseCallback(action=CourseAction.INC, course_id=course_id, count=i, user_id=user_id))
+        buttons.add(back_button(PointsCallback(action=PointsAction.ADD, user_id=user_id).pack()))
+        buttons.adjust(5)
+        return buttons.as_markup()
+    return user_markup(("scores", course_id), user_id, None, build)
+
+def faculties_markup(user_id: int, selectors: Selectors, back_action: MenuAction, group_menu: bool = False) -> InlineKeyboardMarkup:
+    def build(user_id: int) -> InlineKeyboardMarkup:
+        buttons = keyboard.InlineKeyboardBuilder()
+        for index, faculty in enumerate(selectors.faculties):
+            if group_menu:
+                callback_data = GroupMenuCallback(action=GroupMenuAction.SELECT_FACULTY, faculty=index, version=selectors.version, user_id=user_id)
+            else:
+                callback_data = GroupSelectCallback(faculty=index, version=selectors.version, user_id=user_id)
+            buttons.button(text=faculty, callback_data=callback_data)
+        buttons.add(back_button(MenuCallback(action=back_action, user_id=user_id).pack()))
+        buttons.adjust(1)
+        return buttons.as_markup()
+    return user_markup(("faculties", back_action, group_menu), user_id, selectors.version, build)
+
+def groups_markup(user_id: int, selectors: Selectors, faculty: int, group_menu: bool = False) -> InlineKeyboardMarkup:
+    def build(user_id: int) -> InlineKeyboardMarkup:
+        buttons = keyboard.InlineKeyboardBuilder()
+        for group in selectors.faculty_groups[selectors.faculties[faculty]]:
+            if group_menu:
+                callback_data = GroupMenuCallback(action=GroupMenuAction.SET_GROUP, faculty=faculty, group=group, user_id=user_id)
+            else:
+                callback_data = GroupSelectCallback(group=group, user_id=user_id)
+            buttons.button(text=group, callback_data=callback_data)
+        buttons.adjust(3)
+        if group_menu:
+            back = GroupMenuCallback(action=GroupMenuAction.CHANGE_GROUP, user_id=user_id)
+        else:
+            back = GroupSelectCallback(faculty=faculty, version=selectors.version, user_id=user_id)
+        buttons.add(back_button(back.pack()))
+        return buttons.as_markup()
+    return user_markup(("groups", faculty, group_menu), user_id, selectors.version, build)
@@ -0,0 +1,46 @@
+import time
+
+from collections import OrderedDict
+
+from aiogram import Bot
+from aiogram.enums import ChatMemberStatus
+
+class MemberCache:
+    def __init__(self, ttl: float = 10 * 60, max_size: int = 10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.statuses: OrderedDict[tuple[int, int], tuple[float, str]] = OrderedDict()
+        self.admin_chats: dict[int, float] = {}
+
+    def set(self, chat_id: int, user_id: int, status: str):
+        self.statuses[chat_id, user_id] = (time.monotonic() + self.ttl, status)
+        self.statuses.move_to_end((chat_id, user_id))
+        while len(self.statuses) > self.max_size:
+            self.statuses.popitem(last=False)
+
+    def invalidate(self, chat_id: int, user_id: int | None = None):
+        if user_id is not None:
+            self.statuses.pop((chat_id, user_id), None)
+            return
+        self.admin_chats.pop(chat_id, None)
+        for key in [key for key in self.statuses if key[0] == chat_id]:
+            del self.statuses[key]
+
+    async def load_admins(self, bot: Bot, chat_id: int):
+        for member in await bot.get_chat_administrators(chat_id):
+            self.set(chat_id, member.user.id, member.status)
+        self.admin_chats[chat_id] = time.monotonic() + self.ttl
+
+    async def get_status(self, bot: Bot, chat_id: int, user_id: int) -> str:
+        now = time.monotonic()
+        cached = self.statuses.get((chat_id, user_id))
+        if cached and cached[0] > now:
+            self.statuses.move_to_end((chat_id, user_id))
+            return cached[1]
+        if self.admin_chats.get(chat_id, 0) > now:
+            return ChatMemberStatus.MEMBER
+        member = await bot.get_chat_member(chat_id, user_id)
+        self.set(chat_id, user_id, member.status)
+        return member.status
+
+member_cache = MemberCache()
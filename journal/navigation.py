@@ -0,0 +1,62 @@
+import time
+
+from collections import OrderedDict
+
+from database import NavigationTable
+
+class NavigationStore:
+    def __init__(self, max_size: int = 10_000, ttl: float = 24 * 60 * 60, spill: NavigationTable | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.spill = spill
+        self.stacks: OrderedDict[tuple[int, int], tuple[float, list[str]]] = OrderedDict()
+
+    async def push(self, chat_id: int, message_id: int, callback_data: str) -> int:
+        stack = await self._load(chat_id, message_id) or []
+        if callback_data not in stack:
+            stack.append(callback_data)
+        self.stacks[chat_id, message_id] = (time.time() + self.ttl, stack)
+        self.stacks.move_to_end((chat_id, message_id))
+        await self._evict()
+        return stack.index(callback_data)
+
+    async def resolve(self, chat_id: int, message_id: int, token: int | None) -> str | None:
+        stack = await self._load(chat_id, message_id)
+        if stack is None or token is None or not 0 <= token < len(stack):
+            return None
+        return stack[token]
+
+    async def _load(self, chat_id: int, message_id: int) -> list[str] | None:
+        key = (chat_id, message_id)
+        if key in self.stacks:
+            expires_at, stack = self.stacks[key]
+            if expires_at > time.time():
+                return stack
+            del self.stacks[key]
+            return None
+        if self.spill is None:
+            return None
+        stack = await self.spill.pop_stack(chat_id, message_id, int(time.time()))
+        if stack is not None:
+            self.stacks[key] = (time.time() + self.ttl, stack)
+            await self._evict()
+        return stack
+
+    async def _evict(self):
+        now = time.time()
+        while len(self.stacks) > self.max_size:
+            (chat_id, message_id), (expires_at, stack) = self.stacks.popitem(last=False)
+            if self.spill is not None and expires_at > now:
+                await self.spill.save_stack(chat_id, message_id, stack, int(expires_at))
+
+    async def flush(self):
+        if self.spill is None:
+            return
+        now = time.time()
+        await self.spill.delete_expired(int(now))
+        for (chat_id, message_id), (expires_at, stack) in self.stacks.items():
+            if expires_at > now:
+                await self.spill.save_stack(chat_id, message_id, stack, int(expires_at))
+        self.stacks.clear()
+
+navigation = NavigationStore(spill=NavigationTable())
@@ -1,28 +1,95 @@
 import asyncio
+import datetime
+import logging
 import os
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s [" + os.getenv("WORKER_INDEX", "main") + "] %(message)s"
+)
+
 import journal
 
 from aiogram import Dispatcher, Bot
 from aiogram.client.default import DefaultBotProperties
 
+from database import BaseTable, StatesTable, UsersTable, PushRunsTable, migrate
+from journal.handlers import schedule
+from journal.navigation import navigation
 from middlewares import CallbackQueryMiddleware
+from storage import SQLiteStorage
+from timetable import http_client, timetable_cache
+from push import MorningPush
+from outbound import OutboundQueue
+from webhook import run_webhook
+from sharding import run_front, run_worker
+
+storage = SQLiteStorage(StatesTable(), ttl=float(os.getenv("FSM_STATE_TTL", 24 * 60 * 60)))
 
-dispatcher = Dispatcher()
+dispatcher = Dispatcher(storage=storage)
 
 bot = Bot(token=os.getenv("BOT_TOKEN"), default=DefaultBotProperties(parse_mode="HTML"))
+bot.session.middleware(OutboundQueue(rate=float(os.getenv("OUTBOUND_RATE", 25)) / int(os.getenv("WORKERS", 1))))
+
+morning_push = MorningPush(
+    bot,
+    schedule,
+    UsersTable(),
+    PushRunsTable(),
+    at=datetime.time.fromisoformat(os.getenv("PUSH_TIME", "07:00"))
+)
+
+async def on_startup():
+    await BaseTable.connect()
+    await migrate()
+    await BaseTable.start_writer(window=0.005 if os.getenv("DB_GROUP_COMMIT", "0") == "1" else 0)
+    storage.start()
+    await http_client.start()
+    timetable_cache.start()
+    if os.getenv("WORKER_INDEX", "0") == "0":
+        morning_push.start()
+    print("Bot started")
+
+async def on_shutdown():
+    await morning_push.stop()
+    await timetable_cache.stop()
+    await http_client.close()
+    await navigation.flush()
+    await BaseTable.close()
 
 async def main():
-    dispatcher.startup.register(lambda: print("Bot started"))
+    dispatcher.startup.register(on_startup)
+    dispatcher.shutdown.register(on_shutdown)
 
     dispatcher.include_router(journal.dispatcher)
-    dispatcher.callback_query.middleware(CallbackQueryMiddleware())
+    dispatcher.callback_query.outer_middleware(CallbackQueryMiddleware())
     
-    await dispatcher.start_polling(bot)
+    allowed_updates = dispatcher.resolve_used_update_types()
+    mode = os.getenv("BOT_MODE", "polling")
+    workers = int(os.getenv("WORKERS", 1))
+    webhook_settings = dict(
+        host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+        port=int(os.getenv("WEBHOOK_PORT", 8080)),
+        path=os.getenv("WEBHOOK_PATH", "/webhook"),
+        url=os.getenv("WEBHOOK_URL"),
+        secret_token=os.getenv("WEBHOOK_SECRET"),
+        allowed_updates=allowed_updates
+    )
+    if mode == "worker":
+        await run_worker(dispatcher, bot, concurrency=int(os.getenv("WORKER_CONCURRENCY", 64)))
+    elif workers > 1:
+        await migrate()
+        await BaseTable.close()
+        await run_front(bot, workers, webhook=mode == "webhook", **webhook_settings)
+    elif mode == "webhook":
+        await run_webhook(dispatcher, bot, concurrency=int(os.getenv("WEBHOOK_CONCURRENCY", 64)), **webhook_settings)
+    else:
+        await bot.delete_webhook()
+        await dispatcher.start_polling(bot, allowed_updates=allowed_updates)
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -1,8 +1,29 @@
+import time
+
 from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware
 from aiogram.types import CallbackQuery, Message, TelegramObject
 
+from journal.callbacks import parse_callback
+
 class CallbackQueryMiddleware(BaseMiddleware):
+    def __init__(self, rate: float = 2, burst: int = 5, max_users: int = 10_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self.buckets: Dict[int, tuple[float, float]] = {}
+        self.in_flight: set[tuple[int, Any, str]] = set()
+
+    def allow(self, user_id: int) -> bool:
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= 1
+        self.buckets[user_id] = (tokens - allowed, now)
+        if len(self.buckets) > self.max_users:
+            refilled = now - self.burst / self.rate
+            self.buckets = {user_id: bucket for user_id, bucket in self.buckets.items() if bucket[1] > refilled}
+        return allowed
 
     async def __call__(
         self,
@@ -10,7 +31,21 @@ class CallbackQueryMiddleware(BaseMiddleware):
         event: CallbackQuery,
         data: Dict[str, Any]
     ) -> Any:
-        if str(event.from_user.id) not in event.data:
+        callback_data = parse_callback(event.data or "")
+        if callback_data is None:
+            return await event.answer("⚠️ Кнопка устарела")
+        if callback_data.user_id != event.from_user.id:
             return await event.answer("⚠️ Это не твоя кнопка")
 
-        return await handler(event, data)
\ No newline at end of file
+        press = (event.from_user.id, event.message.message_id if event.message else event.inline_message_id, event.data)
+        if press in self.in_flight:
+            return await event.answer()
+        if not self.allow(event.from_user.id):
+            return await event.answer("⏳ Слишком часто, подожди немного")
+
+        data["callback_data"] = callback_data
+        self.in_flight.add(press)
+        try:
+            return await handler(event, data)
+        finally:
+            self.in_flight.discard(press)
@@ -0,0 +1,207 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from contextvars import ContextVar
+from typing import Any, Hashable
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter, TelegramServerError, TelegramNetworkError
+from aiogram.methods import (
+    TelegramMethod,
+    SendMessage, SendPhoto, SendDocument, CopyMessage, ForwardMessage,
+    EditMessageText, EditMessageReplyMarkup, DeleteMessage
+)
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BROADCAST = 10
+
+priority: ContextVar[int] = ContextVar("priority", default=INTERACTIVE)
+
+QUEUED = (SendMessage, SendPhoto, SendDocument, CopyMessage, ForwardMessage, EditMessageText, EditMessageReplyMarkup, DeleteMessage)
+EDITS = (EditMessageText, EditMessageReplyMarkup)
+LOOSE = (EditMessageText, EditMessageReplyMarkup, DeleteMessage)
+
+ABANDONED = object()
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def take(self) -> float:
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def idle(self) -> bool:
+        return time.monotonic() >= self.paused_until and self.tokens + (time.monotonic() - self.updated) * self.rate >= self.burst
+
+class ChatBucket(TokenBucket):
+    def __init__(self, rate: float, burst: float = 1):
+        super().__init__(rate, burst)
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while delay := self.take():
+                await asyncio.sleep(delay)
+
+class PriorityBucket(TokenBucket):
+    def __init__(self, rate: float, burst: float = 1):
+        super().__init__(rate, burst)
+        self.waiters: list[tuple[int, int, asyncio.Future]] = []
+        self.order = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    async def acquire(self, level: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (level, next(self.order), future))
+        self._pump()
+        await future
+
+    def _pump(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self.waiters:
+            if self.waiters[0][2].done():
+                heapq.heappop(self.waiters)
+                continue
+            delay = self.take()
+            if delay:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+            heapq.heappop(self.waiters)[2].set_result(None)
+
+class Edit:
+    __slots__ = ("superseded", "response")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.superseded: asyncio.Future[Edit] = loop.create_future()
+        self.response: asyncio.Future[Any] = loop.create_future()
+
+class OutboundQueue(BaseRequestMiddleware):
+    def __init__(
+        self,
+        rate: float = 25,
+        chat_rate: float = 1,
+        group_rate: float = 20 / 60,
+        chat_burst: float = 3,
+        edit_rate: float = 3,
+        edit_burst: float = 6,
+        attempts: int = 3,
+        max_retry_after: float = 60,
+        max_chats: int = 10_000
+    ):
+        self.bucket = PriorityBucket(rate, rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.edit_rate = edit_rate
+        self.edit_burst = edit_burst
+        self.attempts = attempts
+        self.max_retry_after = max_retry_after
+        self.max_chats = max_chats
+        self.chats: dict[tuple[Any, bool], ChatBucket] = {}
+        self.edits: dict[Hashable, Edit] = {}
+        self.metrics = {"sent": 0, "merged": 0, "retried": 0}
+
+    def chat_bucket(self, chat_id: Any, loose: bool = False) -> ChatBucket:
+        bucket = self.chats.get((chat_id, loose))
+        if bucket is None:
+            if len(self.chats) >= self.max_chats:
+                self.chats = {key: bucket for key, bucket in self.chats.items() if bucket.lock.locked() or not bucket.idle()}
+            if loose:
+                bucket = ChatBucket(self.edit_rate, self.edit_burst)
+            else:
+                is_group = isinstance(chat_id, int) and chat_id < 0
+                bucket = ChatBucket(self.group_rate if is_group else self.chat_rate, self.chat_burst)
+            self.chats[chat_id, loose] = bucket
+        return bucket
+
+    async def _acquire(self, method: TelegramMethod, chat_id: Any, level: int):
+        if chat_id is not None:
+            await self.chat_bucket(chat_id, isinstance(method, LOOSE)).acquire()
+        await self.bucket.acquire(level)
+
+    async def _send(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod, chat_id: Any, level: int, acquired: bool = False) -> Any:
+        for attempt in range(self.attempts):
+            if not acquired:
+                await self._acquire(method, chat_id, level)
+            acquired = False
+            try:
+                response = await make_request(bot, method)
+                self.metrics["sent"] += 1
+                return response
+            except TelegramRetryAfter as error:
+                if attempt == self.attempts - 1 or error.retry_after > self.max_retry_after:
+                    raise
+                logger.warning("Flood control on chat %s, retrying in %s s", chat_id, error.retry_after)
+                if chat_id is not None:
+                    self.chat_bucket(chat_id).pause(error.retry_after)
+                    self.chat_bucket(chat_id, loose=True).pause(error.retry_after)
+                if level >= BROADCAST or chat_id is None:
+                    self.bucket.pause(error.retry_after)
+            except (TelegramServerError, TelegramNetworkError) as error:
+                if attempt == self.attempts - 1:
+                    raise
+                logger.warning("Request to chat %s failed, retrying in %s s: %s", chat_id, 2 ** attempt, error)
+                await asyncio.sleep(2 ** attempt)
+            self.metrics["retried"] += 1
+
+    async def _edit(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod, chat_id: Any, level: int) -> Any:
+        key = (type(method), chat_id, method.message_id, method.inline_message_id)
+        edit = Edit(asyncio.get_running_loop())
+        previous, self.edits[key] = self.edits.get(key), edit
+        if previous is not None and not previous.superseded.done():
+            previous.superseded.set_result(edit)
+        acquire = asyncio.ensure_future(self._acquire(method, chat_id, level))
+        try:
+            await asyncio.wait({acquire, edit.superseded}, return_when=asyncio.FIRST_COMPLETED)
+            if edit.superseded.done():
+                acquire.cancel()
+                self.metrics["merged"] += 1
+                response = await asyncio.shield(edit.superseded.result().response)
+                if response is ABANDONED:
+                    response = await self._edit(make_request, bot, method, chat_id, level)
+            else:
+                response = await self._send(make_request, bot, method, chat_id, level, acquired=True)
+            edit.response.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            edit.response.set_result(ABANDONED)
+            raise
+        except Exception as error:
+            edit.response.set_exception(error)
+            edit.response.exception()
+            raise
+        finally:
+            acquire.cancel()
+            if self.edits.get(key) is edit:
+                del self.edits[key]
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod) -> Any:
+        if not isinstance(method, QUEUED):
+            return await make_request(bot, method)
+        chat_id = getattr(method, "chat_id", None)
+        if isinstance(method, EDITS):
+            return await self._edit(make_request, bot, method, chat_id, priority.get())
+        return await self._send(make_request, bot, method, chat_id, priority.get())
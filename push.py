@@ -0,0 +1,122 @@
+import asyncio
+import datetime
+import logging
+import time
+
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
+
+from database import UsersTable, PushRunsTable, UserRow
+from outbound import priority, BROADCAST
+from timetable import MOSCOW
+
+logger = logging.getLogger(__name__)
+
+class MorningPush:
+    def __init__(
+        self,
+        bot: Bot,
+        render: Callable[[str], Awaitable[str]],
+        users: UsersTable,
+        runs: PushRunsTable,
+        at: datetime.time = datetime.time(7, 0),
+        catch_up: datetime.timedelta = datetime.timedelta(hours=3),
+        batch_size: int = 25
+    ):
+        self.bot = bot
+        self.render = render
+        self.users = users
+        self.runs = runs
+        self.at = at
+        self.catch_up = catch_up
+        self.batch_size = batch_size
+        self.metrics: dict[str, Any] = {}
+        self._task: asyncio.Task | None = None
+
+    async def _send_batch(self, day: str, batch: list[UserRow], text: str):
+        results = await asyncio.gather(
+            *(self.bot.send_message(user.id, text) for user in batch),
+            return_exceptions=True
+        )
+        for user, result in zip(batch, results):
+            if not isinstance(result, BaseException):
+                self.metrics["sent"] += 1
+            elif isinstance(result, TelegramForbiddenError):
+                self.metrics["blocked"] += 1
+                await self.users.set_subscribed(user.id, False)
+            else:
+                self.metrics["failed"] += 1
+                logger.warning("Failed to push schedule to %s: %s", user.id, result)
+        await self.runs.save_progress(day, batch[-1].group, batch[-1].id, self.metrics["sent"], self.metrics["failed"])
+        batch.clear()
+
+    async def run(self, day: datetime.date):
+        key = day.isoformat()
+        progress = await self.runs.get_run(key)
+        if progress and progress["finished_at"]:
+            return
+        after = (progress["last_group"], progress["last_user_id"]) if progress and progress["last_group"] else None
+        self.metrics = {
+            "day": key,
+            "groups": 0,
+            "sent": progress["sent"] if progress else 0,
+            "failed": progress["failed"] if progress else 0,
+            "blocked": 0,
+            "resumed": after is not None,
+            "started_at": time.time(),
+        }
+        logger.info("Morning push for %s %s", key, "resumed" if after else "started")
+
+        group, text, batch = None, None, []
+        async for user in self.users.iter_subscribers(after):
+            if user.group != group:
+                if batch:
+                    await self._send_batch(key, batch, text)
+                group = user.group
+                text = "☀️ <b>Доброе утро!</b>\n\n" + await self.render(group)
+                self.metrics["groups"] += 1
+            batch.append(user)
+            if len(batch) >= self.batch_size:
+                await self._send_batch(key, batch, text)
+                logger.info("Morning push: %(sent)d sent, %(failed)d failed, %(blocked)d blocked, %(groups)d groups", self.metrics)
+        if batch:
+            await self._send_batch(key, batch, text)
+
+        await self.runs.finish(key, int(time.time()))
+        self.metrics["finished_at"] = time.time()
+        logger.info(
+            "Morning push for %(day)s finished: %(sent)d sent, %(failed)d failed, %(blocked)d blocked, %(groups)d groups",
+            self.metrics
+        )
+
+    async def run_forever(self):
+        priority.set(BROADCAST)
+        while True:
+            now = datetime.datetime.now(MOSCOW)
+            today_at = MOSCOW.localize(datetime.datetime.combine(now.date(), self.at))
+            if today_at <= now < today_at + self.catch_up:
+                try:
+                    await self.run(now.date())
+                except Exception:
+                    logger.exception("Morning push for %s failed", now.date())
+                    await asyncio.sleep(60)
+                    continue
+            next_at = today_at if now < today_at else MOSCOW.localize(
+                datetime.datetime.combine(now.date() + datetime.timedelta(days=1), self.at)
+            )
+            await asyncio.sleep((next_at - datetime.datetime.now(MOSCOW)).total_seconds())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import os
+import secrets
+import sys
+
+from typing import Any
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import TelegramNetworkError
+
+logger = logging.getLogger(__name__)
+
+BROADCAST = {"chat_member", "my_chat_member"}
+
+def update_key(update: dict[str, Any]) -> int:
+    for name, payload in update.items():
+        if name == "update_id" or not isinstance(payload, dict):
+            continue
+        for field in ("from", "user", "chat"):
+            if isinstance(payload.get(field), dict) and "id" in payload[field]:
+                return payload[field]["id"]
+    return update["update_id"]
+
+class Shard:
+    def __init__(self, index: int, count: int, command: list[str], backlog: int = 1000):
+        self.index = index
+        self.count = count
+        self.command = command
+        self.process: asyncio.subprocess.Process | None = None
+        self.lock = asyncio.Lock()
+        self.lines: asyncio.Queue[bytes] = asyncio.Queue(backlog)
+        self._pump: asyncio.Task | None = None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command,
+            stdin=asyncio.subprocess.PIPE,
+            env={**os.environ, "BOT_MODE": "worker", "WORKER_INDEX": str(self.index), "WORKERS": str(self.count)}
+        )
+
+    async def send(self, line: bytes):
+        async with self.lock:
+            for _ in range(2):
+                if self.process is None or self.process.returncode is not None:
+                    logger.warning("Worker %s is not running, restarting it", self.index)
+                    await self.start()
+                try:
+                    self.process.stdin.write(line)
+                    await self.process.stdin.drain()
+                    return
+                except (BrokenPipeError, ConnectionResetError):
+                    await self.process.wait()
+            raise RuntimeError(f"Worker {self.index} keeps exiting")
+
+    async def pump(self):
+        while True:
+            line = await self.lines.get()
+            try:
+                await self.send(line)
+            except Exception:
+                logger.exception("Failed to forward an update to worker %s", self.index)
+            finally:
+                self.lines.task_done()
+
+    async def stop(self):
+        if self._pump is not None:
+            await self.lines.join()
+            self._pump.cancel()
+            self._pump = None
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            self.process.stdin.close()
+            await self.process.wait()
+        self.process = None
+
+class ShardRouter:
+    def __init__(self, workers: int, command: list[str] | None = None):
+        command = command or [sys.executable, *sys.argv]
+        self.shards = [Shard(index, workers, command) for index in range(workers)]
+
+    @property
+    def alive(self) -> int:
+        return sum(shard.process is not None and shard.process.returncode is None for shard in self.shards)
+
+    async def start(self):
+        await asyncio.gather(*(shard.start() for shard in self.shards))
+        for shard in self.shards:
+            shard._pump = asyncio.create_task(shard.pump())
+
+    async def stop(self):
+        await asyncio.gather(*(shard.stop() for shard in self.shards))
+
+    async def feed_raw_update(self, update: dict[str, Any]):
+        line = json.dumps(update, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        if BROADCAST.intersection(update):
+            await asyncio.gather(*(shard.lines.put(line) for shard in self.shards))
+        else:
+            await self.shards[update_key(update) % len(self.shards)].lines.put(line)
+
+async def run_worker(dispatcher: Dispatcher, bot: Bot, concurrency: int = 64, per_user: int = 8):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=2 ** 20, loop=loop)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), sys.stdin)
+
+    slots = asyncio.Semaphore(concurrency)
+    pending = asyncio.Semaphore(concurrency * 4)
+    tails: dict[int, asyncio.Task] = {}
+    queued: dict[int, int] = {}
+
+    async def feed(update: dict[str, Any], previous: asyncio.Task | None):
+        try:
+            if previous is not None:
+                await asyncio.wait({previous})
+            async with slots:
+                await dispatcher.feed_raw_update(bot, update)
+        except Exception:
+            logger.exception("Failed to process update %s", update.get("update_id"))
+
+    def forget(key: int, task: asyncio.Task):
+        pending.release()
+        queued[key] -= 1
+        if not queued[key]:
+            del queued[key]
+        if tails.get(key) is task:
+            del tails[key]
+
+    await dispatcher.emit_startup(bot=bot, dispatcher=dispatcher)
+    try:
+        while line := await reader.readline():
+            update = json.loads(line)
+            key = update_key(update)
+            if queued.get(key, 0) >= per_user:
+                logger.warning("Dropping update %s: %s already has %s updates queued", update.get("update_id"), key, per_user)
+                continue
+            await pending.acquire()
+            queued[key] = queued.get(key, 0) + 1
+            task = tails[key] = asyncio.create_task(feed(update, tails.get(key)))
+            task.add_done_callback(lambda task, key=key: forget(key, task))
+        if tails:
+            await asyncio.wait(set(tails.values()))
+    finally:
+        await dispatcher.emit_shutdown(bot=bot, dispatcher=dispatcher)
+        await bot.session.close()
+
+async def poll_into(router: ShardRouter, bot: Bot, allowed_updates: list[str] | None = None):
+    await bot.delete_webhook()
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=30, allowed_updates=allowed_updates)
+        except TelegramNetworkError as error:
+            logger.warning("Failed to fetch updates: %s", error)
+            await asyncio.sleep(5)
+            continue
+        for update in updates:
+            await router.feed_raw_update(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+            offset = update.update_id + 1
+
+def build_front_app(router: ShardRouter, path: str, secret_token: str | None) -> web.Application:
+    app = web.Application()
+
+    async def handle(request: web.Request) -> web.Response:
+        if secret_token and not secrets.compare_digest(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), secret_token):
+            return web.Response(body="Unauthorized", status=401)
+        await router.feed_raw_update(await request.json())
+        return web.json_response({})
+
+    async def health(request: web.Request) -> web.Response:
+        alive = router.alive
+        return web.json_response(
+            {"status": "ok" if alive == len(router.shards) else "degraded", "workers": alive},
+            status=200 if alive else 503
+        )
+
+    app.router.add_post(path, handle)
+    app.router.add_get("/health", health)
+    return app
+
+async def run_front(
+    bot: Bot,
+    workers: int,
+    webhook: bool = False,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    path: str = "/webhook",
+    url: str | None = None,
+    secret_token: str | None = None,
+    allowed_updates: list[str] | None = None
+):
+    router = ShardRouter(workers)
+    await router.start()
+    try:
+        if not webhook:
+            await poll_into(router, bot, allowed_updates)
+            return
+        if url and not secret_token:
+            secret_token = secrets.token_urlsafe(32)
+        runner = web.AppRunner(build_front_app(router, path, secret_token))
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, host, port).start()
+            if url:
+                await bot.set_webhook(url.rstrip("/") + path, secret_token=secret_token, allowed_updates=allowed_updates)
+            print(f"Routing updates from http://{host}:{port}{path} to {workers} workers")
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+    finally:
+        await router.stop()
+        await bot.session.close()
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import logging
+import time
+
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType
+
+from database import StatesTable
+
+logger = logging.getLogger(__name__)
+
+class SQLiteStorage(BaseStorage):
+    def __init__(self, table: StatesTable, ttl: float = 24 * 60 * 60, sweep_interval: float = 10 * 60):
+        self.table = table
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.cache: dict[str, tuple[str | None, str, float]] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    @staticmethod
+    def build_key(key: StorageKey) -> str:
+        return ":".join(str(part) if part is not None else "" for part in (
+            key.bot_id, key.chat_id, key.user_id, key.thread_id, key.business_connection_id, key.destiny
+        ))
+
+    async def _load(self, key: str) -> tuple[str | None, str]:
+        entry = self.cache.get(key)
+        if entry is None:
+            row = await self.table.get_state(key)
+            if row is None or row["updated_at"] < time.time() - self.ttl:
+                self.cache[key] = (None, "{}", time.time())
+                return None, "{}"
+            entry = self.cache[key] = (row["state"], row["data"], row["updated_at"])
+        elif entry[2] < time.time() - self.ttl:
+            return None, "{}"
+        return entry[0], entry[1]
+
+    async def _save(self, key: str, state: str | None, data: str):
+        if state is None and data == "{}":
+            entry = self.cache.get(key)
+            self.cache[key] = (None, "{}", time.time())
+            if entry is None or entry[:2] != (None, "{}"):
+                await self.table.delete_state(key)
+            return
+        now = int(time.time())
+        self.cache[key] = (state, data, now)
+        await self.table.set_state(key, state, data, now)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.build_key(key)
+        _, data = await self._load(storage_key)
+        await self._save(storage_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _ = await self._load(self.build_key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        storage_key = self.build_key(key)
+        state, _ = await self._load(storage_key)
+        await self._save(storage_key, state, json.dumps(dict(data), separators=(",", ":")))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        _, data = await self._load(self.build_key(key))
+        return json.loads(data)
+
+    def footprint(self) -> dict[str, int]:
+        return {
+            "states": len(self.cache),
+            "bytes": sum(len(key) + len(state or "") + len(data) for key, (state, data, _) in self.cache.items()),
+        }
+
+    async def sweep(self):
+        updated_before = time.time() - self.ttl
+        for key in [key for key, (_, _, updated_at) in self.cache.items() if updated_at < updated_before]:
+            del self.cache[key]
+        await self.table.delete_expired(int(updated_before))
+        logger.info("FSM storage: %(states)d cached states, %(bytes)d bytes", self.footprint())
+
+    async def run_sweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Failed to sweep FSM storage")
+
+    def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self.run_sweeper())
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
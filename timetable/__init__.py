@@ -0,0 +1,7 @@
+from .client       import *
+from .index        import *
+from .singleflight import *
+from .api          import *
+from .selectors    import *
+from .groups       import *
+from .render       import *
@@ -0,0 +1,13 @@
+from httpx import Response
+
+from .client import HttpClient
+
+BASE_URL = "https://timetable.tversu.ru/api/v1"
+
+http_client = HttpClient(BASE_URL)
+
+async def get_selectors() -> dict:
+    return http_client.decode(await http_client.get("/selectors"))
+
+async def get_group_timetable(group_id: int, headers: dict | None = None) -> Response:
+    return await http_client.get("/group", params={"group": group_id, "type": "classes"}, headers=headers)
@@ -0,0 +1,106 @@
+import asyncio
+import random
+import time
+
+from typing import Any, Callable
+
+from httpx import AsyncClient, Limits, Response, TransportError
+
+class UpstreamError(Exception):
+    pass
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+class HttpClient:
+    def __init__(
+        self,
+        base_url: str,
+        attempts: int = 3,
+        timeout: float = 3,
+        deadline: float = 8,
+        backoff: float = 0.25,
+        max_backoff: float = 2,
+        limits: Limits = Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60),
+        breaker: CircuitBreaker | None = None
+    ):
+        self.base_url = base_url
+        self.attempts = attempts
+        self.timeout = timeout
+        self.deadline = deadline
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limits = limits
+        self.breaker = breaker or CircuitBreaker()
+        self.client: AsyncClient | None = None
+
+    async def start(self):
+        if self.client is None:
+            self.client = AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def get(self, url: str, **kwargs) -> Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Upstream {self.base_url} is unavailable")
+        await self.start()
+        try:
+            response = await asyncio.wait_for(self._get_with_retries(url, **kwargs), self.deadline)
+        except asyncio.TimeoutError as error:
+            self.breaker.record_failure()
+            raise UpstreamError(f"GET {url} exceeded {self.deadline}s deadline") from error
+        except UpstreamError:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise UpstreamError(f"GET {url} returned {response.status_code}")
+        return response
+
+    def decode(self, response: Response, parse: Callable[[Any], Any] = lambda data: data) -> Any:
+        try:
+            return parse(response.json())
+        except (ValueError, LookupError, TypeError) as error:
+            self.breaker.record_failure()
+            raise UpstreamError(f"GET {response.request.url} returned an unexpected body") from error
+
+    async def _get_with_retries(self, url: str, **kwargs) -> Response:
+        for attempt in range(self.attempts):
+            try:
+                response = await self.client.get(url, **kwargs)
+            except TransportError as error:
+                last_error = error
+            else:
+                if response.status_code < 500 and response.status_code != 429:
+                    return response
+                last_error = UpstreamError(f"GET {url} returned {response.status_code}")
+            if attempt + 1 < self.attempts:
+                await asyncio.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+        raise UpstreamError(f"GET {url} failed after {self.attempts} attempts") from last_error
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import itertools
+import logging
+import time
+
+from collections import OrderedDict
+
+from .api          import get_group_timetable, http_client
+from .client       import UpstreamError, CircuitOpenError
+from .index        import CompiledTimetable
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+versions = itertools.count(1)
+
+class TimetableEntry:
+    def __init__(self, timetable: dict, digest: str, etag: str | None = None, last_modified: str | None = None):
+        self.timetable = timetable
+        self.compiled = CompiledTimetable(timetable)
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+        self.version = next(versions)
+        self.fetched_at = time.monotonic()
+        self.requested_at = self.fetched_at
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+class TimetableCache:
+    def __init__(self, ttl: float = 30 * 60, max_size: int = 512, refresh_interval: float = 10 * 60, recent: float = 3 * 60 * 60):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.refresh_interval = refresh_interval
+        self.recent = recent
+        self.entries: OrderedDict[int, TimetableEntry] = OrderedDict()
+        self._refresher: asyncio.Task | None = None
+        self._flight = SingleFlight()
+
+    async def get(self, group_id: int) -> TimetableEntry:
+        entry = self.entries.get(group_id)
+        if entry is None or entry.age() > self.ttl:
+            try:
+                entry = await self.refresh(group_id)
+            except UpstreamError:
+                if entry is None:
+                    raise
+                logger.warning("Serving stale timetable of group %s", group_id)
+        if group_id in self.entries:
+            self.entries.move_to_end(group_id)
+        entry.requested_at = time.monotonic()
+        return entry
+
+    async def refresh(self, group_id: int) -> TimetableEntry:
+        return await self._flight.do(group_id, lambda: self._fetch(group_id))
+
+    async def _fetch(self, group_id: int) -> TimetableEntry:
+        entry = self.entries.get(group_id)
+        headers = {}
+        if entry and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+        response = await get_group_timetable(group_id, headers)
+        if entry and response.status_code == 304:
+            entry.fetched_at = time.monotonic()
+        else:
+            digest = hashlib.sha256(response.content).hexdigest()
+            etag, last_modified = response.headers.get("ETag"), response.headers.get("Last-Modified")
+            if entry and entry.digest == digest:
+                entry.etag, entry.last_modified = etag, last_modified
+                entry.fetched_at = time.monotonic()
+            else:
+                entry = http_client.decode(response, lambda data: TimetableEntry(data[0], digest, etag, last_modified))
+
+        self.entries[group_id] = entry
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return entry
+
+    async def run_refresher(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            now = time.monotonic()
+            for group_id, entry in list(self.entries.items()):
+                if now - entry.requested_at > self.recent or entry.age() < self.refresh_interval:
+                    continue
+                try:
+                    await self.refresh(group_id)
+                except CircuitOpenError:
+                    break
+                except UpstreamError as error:
+                    logger.warning("Failed to refresh timetable of group %s: %s", group_id, error)
+                except Exception:
+                    logger.exception("Failed to refresh timetable of group %s", group_id)
+
+    def start(self):
+        if self._refresher is None:
+            self._refresher = asyncio.create_task(self.run_refresher())
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+timetable_cache = TimetableCache()
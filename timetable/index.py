@@ -0,0 +1,53 @@
+import datetime
+import pytz
+
+MOSCOW = pytz.timezone("Europe/Moscow")
+WEEK_TYPES = ("minus", "plus")
+CYCLE_DAYS = 14
+
+class CompiledTimetable:
+    def __init__(self, timetable: dict):
+        self.start = MOSCOW.localize(datetime.datetime.strptime(timetable["start"], "%d.%m.%Y"))
+        self.lesson_times = [
+            (lesson_time["start"], lesson_time["end"], datetime.datetime.strptime(lesson_time["start"], "%H:%M").time())
+            for lesson_time in timetable["lessonTimeData"]
+        ]
+
+        buckets = {}
+        for lesson in timetable["lessonsContainers"]:
+            buckets.setdefault((lesson["weekDay"], lesson["weekMark"]), []).append(lesson)
+        self.lessons = {
+            (day, week): sorted(buckets.get((day, "every"), []) + buckets.get((day, week), []), key=lambda x: x["lessonNumber"])
+            for day in range(1, 8) for week in WEEK_TYPES
+        }
+
+        self.next_offsets = {}
+        for day in range(1, 8):
+            for week in WEEK_TYPES:
+                self.next_offsets[day, week] = next(
+                    (offset for offset in range(1, CYCLE_DAYS + 1) if self.lessons[self.shift(day, week, offset)]),
+                    None
+                )
+
+    @staticmethod
+    def shift(day: int, week: str, offset: int) -> tuple[int, str]:
+        total_day = day + offset
+        weeks_passed = (total_day - 1) // 7
+        check_day = (total_day - 1) % 7 + 1
+        return check_day, week if weeks_passed % 2 == 0 else ("plus" if week == "minus" else "minus")
+
+    def week_type(self, date: datetime.datetime) -> str:
+        return "plus" if (date - self.start).days // 7 % 2 == 1 else "minus"
+
+    def get_lessons(self, day: int, week: str) -> list[dict]:
+        return self.lessons[day, week]
+
+    def choose_day(self, day: int, week: str, current_time: datetime.time) -> tuple[int, str, str] | None:
+        today_lessons = self.lessons[day, week]
+        if today_lessons and self.lesson_times[today_lessons[-1]["lessonNumber"]][2] > current_time:
+            return day, week, "на сегодня"
+        offset = self.next_offsets[day, week]
+        if offset is None:
+            return None
+        label = "на завтра" if offset == 1 else "на " + "после" * (offset - 1) + "завтра"
+        return *self.shift(day, week, offset), label
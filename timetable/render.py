@@ -0,0 +1,53 @@
+import re
+
+from collections import OrderedDict
+
+from aiogram.utils import formatting
+
+from utils import time_to_emoji
+
+from .index import CompiledTimetable
+
+LESSON_TYPE_SUFFIX = re.compile(r" \((?:Лекция|Практика|Лаб\. работа)\)")
+
+LEGEND = (
+    "\n"
+    f"<code>📓 Обозначения: </code>\n"
+    f"   <code>Л  - Лекция</code>\n"
+    f"   <code>П  - Практика</code>\n"
+    f"   <code>ЛР - Лабораторная работа</code>\n\n"
+)
+
+def lessons_text_builder(lessons: list[dict], timetable: CompiledTimetable) -> str:
+    titles = [LESSON_TYPE_SUFFIX.sub("", lesson['texts'][1]) for lesson in lessons]
+    max_length = max(len(title) for title in titles)
+
+    lessons_text = ""
+    for lesson, title in zip(lessons, titles):
+        lesson_type = "Л" if "Лекция" in lesson['texts'][1] else "П" if "Практика" in lesson['texts'][1] else "ЛР"
+        start, end, _ = timetable.lesson_times[lesson["lessonNumber"]]
+        lessons_text += f"{time_to_emoji(start)} {start}-{end} {title:<{max_length}} {lesson_type:<2} | {lesson['texts'][3].split()[-1]}\n"
+
+    return lessons_text
+
+def render_schedule(timetable: CompiledTimetable, day: int, week: str, label: str) -> str:
+    lessons_text = lessons_text_builder(timetable.get_lessons(day, week), timetable)
+    return formatting.Pre(lessons_text, language=f'📅 Расписание {label}:').as_html() + LEGEND
+
+class RenderCache:
+    def __init__(self, max_size: int = 2048):
+        self.max_size = max_size
+        self.blocks: OrderedDict[tuple, str] = OrderedDict()
+
+    def render(self, group_id: int, version: int, timetable: CompiledTimetable, day: int, week: str, label: str) -> str:
+        key = (group_id, day, week, label, version)
+        block = self.blocks.get(key)
+        if block is None:
+            block = self.blocks[key] = render_schedule(timetable, day, week, label)
+            while len(self.blocks) > self.max_size:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(key)
+        return block
+
+render_cache = RenderCache()
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import time
+
+from utils import sort_key
+
+from .api          import get_selectors
+from .client       import UpstreamError
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+class Selectors:
+    def __init__(self, data: dict, version: int = 1):
+        self.data = data
+        self.version = version
+        faculty_groups = {}
+        self.group_ids = {}
+        for group in data["groups"]:
+            self.group_ids[group["groupName"]] = group["groupId"]
+            faculty_groups.setdefault(group["facultyName"], []).append(group["groupName"])
+        self.faculties = sorted(faculty_groups)
+        self.faculty_groups = {faculty: sorted(groups, key=sort_key) for faculty, groups in faculty_groups.items()}
+
+class SelectorsCache:
+    def __init__(self, ttl: float = 60 * 60):
+        self.ttl = ttl
+        self.selectors: Selectors | None = None
+        self.fetched_at = 0.0
+        self._refresh_task: asyncio.Task | None = None
+        self._flight = SingleFlight()
+
+    async def get(self) -> Selectors:
+        if self.selectors is None:
+            await self.refresh()
+        elif self.stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+        return self.selectors
+
+    @property
+    def stale(self) -> bool:
+        return time.monotonic() - self.fetched_at > self.ttl
+
+    async def refresh(self):
+        await self._flight.do("selectors", self._fetch)
+
+    async def _fetch(self):
+        data = await get_selectors()
+        if self.selectors is None or self.selectors.data != data:
+            try:
+                self.selectors = Selectors(data, self.selectors.version + 1 if self.selectors else 1)
+            except (LookupError, TypeError) as error:
+                raise UpstreamError("Selectors payload has an unexpected shape") from error
+        self.fetched_at = time.monotonic()
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except UpstreamError as error:
+            logger.warning("Serving stale timetable selectors: %s", error)
+        except Exception:
+            logger.exception("Failed to refresh timetable selectors")
+
+selectors_cache = SelectorsCache()
@@ -0,0 +1,15 @@
+import asyncio
+
+from typing import Any, Awaitable, Callable, Hashable
+
+class SingleFlight:
+    def __init__(self):
+        self.calls: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self.calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self.calls[key] = future
+            future.add_done_callback(lambda _: self.calls.pop(key, None))
+        return await asyncio.shield(future)
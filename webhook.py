@@ -0,0 +1,84 @@
+import asyncio
+import secrets
+
+from typing import Any
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from database import BaseTable
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, concurrency: int = 64, **kwargs: Any):
+        super().__init__(dispatcher, bot, **kwargs)
+        self.concurrency = concurrency
+        self.slots = asyncio.Semaphore(concurrency)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._background_feed_update_tasks)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        await self.slots.acquire()
+        try:
+            return await super()._handle_request_background(bot, request)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot, update)
+        finally:
+            self.slots.release()
+
+def build_app(dispatcher: Dispatcher, bot: Bot, path: str, secret_token: str | None, concurrency: int) -> web.Application:
+    app = web.Application()
+    handler = BoundedRequestHandler(dispatcher, bot, concurrency=concurrency, secret_token=secret_token)
+    handler.register(app, path=path)
+
+    async def health(request: web.Request) -> web.Response:
+        healthy = BaseTable.connection is not None
+        return web.json_response(
+            {"status": "ok" if healthy else "unavailable", "in_flight": handler.in_flight, "concurrency": handler.concurrency},
+            status=200 if healthy else 503
+        )
+
+    app.router.add_get("/health", health)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+async def run_webhook(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    host: str = "0.0.0.0",
+    port: int = 8080,
+    path: str = "/webhook",
+    url: str | None = None,
+    secret_token: str | None = None,
+    concurrency: int = 64,
+    allowed_updates: list[str] | None = None
+):
+    if url and not secret_token:
+        secret_token = secrets.token_urlsafe(32)
+    app = build_app(dispatcher, bot, path, secret_token, concurrency)
+
+    if url:
+        async def set_webhook(app: web.Application):
+            await bot.set_webhook(
+                url.rstrip("/") + path,
+                secret_token=secret_token,
+                allowed_updates=allowed_updates,
+                max_connections=min(concurrency, 100)
+            )
+        app.on_startup.append(set_webhook)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        print(f"Listening for updates on http://{host}:{port}{path}")
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()